@@ -4,7 +4,7 @@ mysh_llm.py - AI Assistant for PicoBox Shell
 
 This script provides natural language to shell command translation using:
 1. RAG (Retrieval-Augmented Generation) - scoring commands by relevance
-2. LLM (OpenAI API) - generating smart command suggestions
+2. LLM (OpenAI API via openai, httpx or curl) - generating smart command suggestions
 3. Fallback heuristics - works without API key
 
 Usage:
@@ -17,24 +17,115 @@ Environment Variables:
     MYSH_CATALOG_CMD   - Command to get catalog (default: ./build/picobox --commands-json)
     MYSH_LLM_MODEL     - OpenAI model (default: gpt-4o-mini)
     MYSH_LLM_DEBUG     - Enable debug output (set to 1)
+    MYSH_LLM_NOCACHE   - Bypass the on-disk LLM response cache (set to 1)
+    MYSH_LLM_MAX_DESC  - Max description chars per command in prompts (default: 200, 0 = no limit)
+    MYSH_LLM_CONCURRENCY - Max in-flight requests for suggest_commands_parallel (default: 10)
+    MYSH_LLM_RPM       - Requests per minute limit for parallel calls (default: 500)
+    MYSH_LLM_TPM       - Tokens per minute limit for parallel calls (default: 200000)
 """
 
+# The script runs once per query, so startup time matters: only modules
+# needed to define this file are imported here. Everything used by a
+# single code path (subprocess, json, pickle, numpy, ...) is imported
+# inside the function that needs it.
+from __future__ import annotations
+
 import os
 import sys
-import json
-import subprocess
-from typing import List, Optional, Dict, Any
-from dataclasses import dataclass
+import re
+import importlib.util
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Dict, Any, FrozenSet, Sequence, Tuple, Union
+from dataclasses import dataclass, field
+
+
+@lru_cache(maxsize=1)
+def _json_codec() -> Tuple[Callable[[Any], Any], Callable[[Any], str]]:
+    """
+    Return the (loads, dumps) pair used for all JSON handling
+
+    orjson is optional: a C parser several times faster than the stdlib
+    json. dumps always returns str.
+    """
+    try:
+        import orjson
+    except ImportError:
+        import json
+        return json.loads, json.dumps
 
+    return orjson.loads, lambda obj: orjson.dumps(obj).decode()
 
-@dataclass
+
+def _loads(data: Any) -> Any:
+    return _json_codec()[0](data)
+
+
+def _dumps(obj: Any) -> str:
+    return _json_codec()[1](obj)
+
+
+@lru_cache(maxsize=1)
+def _numpy() -> Any:
+    """
+    Return the numpy module, or None if it isn't installed
+
+    numpy is optional: it vectorizes index scoring, pure Python is the
+    fallback.
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+@dataclass(slots=True, frozen=True)
 class CommandInfo:
-    """Information about a shell command"""
+    """Information about a shell command (immutable and hashable)"""
     name: str
     summary: str
     description: str
     usage: str
 
+    # Lowercased word sets used by score_command, computed once per command
+    _name_tok: FrozenSet[str] = field(init=False, repr=False, compare=False)
+    _sum_tok: FrozenSet[str] = field(init=False, repr=False, compare=False)
+    _desc_tok: FrozenSet[str] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # Frozen: derived fields have to bypass the generated __setattr__
+        object.__setattr__(self, '_name_tok', _tokenize(self.name))
+        object.__setattr__(self, '_sum_tok', _tokenize(self.summary))
+        object.__setattr__(self, '_desc_tok', _tokenize(self.description))
+
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def _tokenize(text: str) -> FrozenSet[str]:
+    """Split text into its set of lowercased words"""
+    return frozenset(_WORD_RE.findall(text.lower()))
+
+
+class _QueryCtx(NamedTuple):
+    """A query preprocessed once and threaded through scoring and heuristics"""
+    raw: str
+    tokenset: FrozenSet[str]
+
+
+def _query_ctx(query: Union[str, _QueryCtx]) -> _QueryCtx:
+    """Preprocess a query string (a _QueryCtx is returned unchanged)"""
+    if isinstance(query, _QueryCtx):
+        return query
+
+    return _QueryCtx(query, _tokenize(query))
+
+
+DEFAULT_CATALOG_CMD = './build/picobox --commands-json'
+
+# Bump whenever the pickled row format changes so stale pickles are never loaded
+CATALOG_CACHE_VERSION = 5
+
 
 def debug_print(msg: str) -> None:
     """Print debug message to stderr if debug mode enabled"""
@@ -42,94 +133,419 @@ def debug_print(msg: str) -> None:
         print(f"[mysh_llm] {msg}", file=sys.stderr)
 
 
-def run_catalog_command() -> Optional[str]:
+def run_catalog_command(catalog_cmd: Optional[str] = None) -> Optional[bytes]:
     """
     Run the shell's --commands-json command to get command catalog
 
-    Returns JSON string or None on error
+    Uses MYSH_CATALOG_CMD (or the default) when catalog_cmd is not given.
+    The command is split shell-style and run without a shell.
+
+    Returns raw JSON bytes or None on error
     """
-    catalog_cmd = os.environ.get('MYSH_CATALOG_CMD', './build/picobox --commands-json')
+    import shlex
+    import subprocess
+
+    if catalog_cmd is None:
+        catalog_cmd = os.environ.get('MYSH_CATALOG_CMD', DEFAULT_CATALOG_CMD)
     debug_print(f"Running catalog command: {catalog_cmd}")
 
     try:
+        # Keep stdout as bytes: the JSON parser takes them without a decode copy
         result = subprocess.run(
-            catalog_cmd.split(),
+            shlex.split(catalog_cmd),
             capture_output=True,
-            text=True,
             timeout=5
         )
 
         if result.returncode == 0:
             return result.stdout
         else:
-            debug_print(f"Catalog command failed: {result.stderr}")
+            debug_print(f"Catalog command failed: {result.stderr.decode(errors='replace')}")
             return None
     except Exception as e:
         debug_print(f"Error running catalog command: {e}")
         return None
 
 
-def load_catalog_from_file(filename: str = "commands.json") -> Optional[str]:
+def load_catalog_from_file(filename: str = "commands.json") -> Optional[bytes]:
     """
     Load command catalog from a JSON file (fallback method)
 
-    Returns JSON string or None if file doesn't exist
+    Returns raw JSON bytes or None if file doesn't exist
     """
     try:
-        with open(filename, 'r') as f:
+        with open(filename, 'rb') as f:
             return f.read()
     except FileNotFoundError:
         return None
 
 
-def load_command_catalog() -> List[CommandInfo]:
+def cache_dir() -> str:
+    """Base directory for mysh_llm's on-disk caches (~/.cache/mysh_llm)"""
+    return os.path.join(os.path.expanduser('~'), '.cache', 'mysh_llm')
+
+
+def _atomic_write(path: str, data: bytes) -> None:
     """
-    Load the command catalog using available methods
+    Write data to path atomically (temp file in the same dir + os.replace)
+
+    Readers never observe a partially written file.
+    """
+    import tempfile
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
 
-    Tries (in order):
-    1. Run catalog command (picobox --commands-json)
-    2. Load from commands.json file
-    3. Return empty list
 
-    Returns list of CommandInfo objects
+def _catalog_cache_path() -> Optional[str]:
     """
-    # Try running catalog command
-    json_str = run_catalog_command()
+    Path of the pickled catalog for the current picobox binary
 
-    # Fallback to file
-    if not json_str:
-        debug_print("Falling back to commands.json file")
-        json_str = load_catalog_from_file()
+    The file name embeds the binary's mtime and size, so rebuilding picobox
+    invalidates the cache. Returns None if the binary can't be stat'ed.
+    """
+    import shlex
 
-    # Parse JSON
-    if not json_str:
-        debug_print("No catalog available")
-        return []
+    binary = shlex.split(DEFAULT_CATALOG_CMD)[0]
+    try:
+        st = os.stat(binary)
+    except OSError as e:
+        debug_print(f"Cannot stat {binary}, catalog cache disabled: {e}")
+        return None
+
+    name = f"catalog-{st.st_mtime_ns}-{st.st_size}-v{CATALOG_CACHE_VERSION}.pkl"
+    return os.path.join(cache_dir(), name)
+
+
+def _read_catalog_cache(path: str) -> Optional[List[CommandInfo]]:
+    """
+    Load a pickled catalog
+
+    The pickle holds plain (name, summary, description, usage) tuples; see
+    _write_catalog_cache.
+
+    Returns list of CommandInfo objects or None on a cache miss
+    """
+    import pickle
+
+    try:
+        with open(path, 'rb') as f:
+            commands = [CommandInfo(*row) for row in pickle.load(f)]
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        debug_print(f"Ignoring unreadable catalog cache {path}: {e}")
+        return None
+
+    debug_print(f"Loaded {len(commands)} commands from cache {path}")
+    return commands
+
+
+def _write_catalog_cache(path: str, commands: List[CommandInfo]) -> None:
+    """
+    Pickle the catalog to path (errors are logged, never raised)
+
+    Rows are stored as plain tuples rather than CommandInfo objects: a
+    pickled class is looked up by module, which is __main__ when run as a
+    script but mysh_llm when imported, so neither could read the other's
+    cache.
+    """
+    import pickle
+
+    rows = [(cmd.name, cmd.summary, cmd.description, cmd.usage) for cmd in commands]
+
+    try:
+        _atomic_write(path, pickle.dumps(rows, protocol=pickle.HIGHEST_PROTOCOL))
+        debug_print(f"Wrote catalog cache {path}")
+    except Exception as e:
+        debug_print(f"Failed to write catalog cache {path}: {e}")
 
+
+def _command_from_json(cmd: Dict[str, Any]) -> CommandInfo:
+    """Build a CommandInfo from one entry of the catalog's "commands" list"""
+    return CommandInfo(
+        name=cmd.get('name', ''),
+        summary=cmd.get('summary', ''),
+        description=cmd.get('description', ''),
+        usage=cmd.get('usage', '')
+    )
+
+
+def parse_catalog(json_str: bytes) -> Optional[List[CommandInfo]]:
+    """
+    Parse --commands-json output (bytes or str) into CommandInfo objects
+
+    Returns list of CommandInfo objects or None on parse error
+    """
     try:
-        data = json.loads(json_str)
+        data = _loads(json_str)
         commands = []
 
         for cmd in data.get('commands', []):
-            commands.append(CommandInfo(
-                name=cmd.get('name', ''),
-                summary=cmd.get('summary', ''),
-                description=cmd.get('description', ''),
-                usage=cmd.get('usage', '')
-            ))
+            commands.append(_command_from_json(cmd))
 
         debug_print(f"Loaded {len(commands)} commands")
         return commands
 
-    except json.JSONDecodeError as e:
+    except (ValueError, AttributeError, TypeError) as e:
+        # json and orjson decode errors both subclass ValueError; the other
+        # two mean valid JSON of the wrong shape (e.g. [] or {"commands": [1]})
         debug_print(f"JSON parse error: {e}")
-        return []
+        return None
+
+
+# ijson is optional: it parses the catalog incrementally as picobox writes it
+_IJSON_AVAILABLE = importlib.util.find_spec('ijson') is not None
+
+
+def _check_catalog_events(events: Iterable[Tuple[str, str, Any]]) -> Iterator[Tuple[str, str, Any]]:
+    """
+    Pass ijson parse events through, raising ValueError on the shapes
+    parse_catalog rejects: a non-object document or a non-array "commands"
+
+    ijson.items would silently yield nothing for those instead.
+    """
+    for i, (prefix, event, value) in enumerate(events):
+        if i == 0 and event != 'start_map':
+            raise ValueError(f"catalog is not a JSON object ({event})")
+        if prefix == 'commands' and event not in ('start_array', 'end_array'):
+            raise ValueError(f'"commands" is not a JSON array ({event})')
+        yield prefix, event, value
+
+
+def stream_catalog_command(catalog_cmd: str) -> Optional[List[CommandInfo]]:
+    """
+    Run the catalog command and parse its output as it streams in
+
+    Each entry of "commands" becomes a CommandInfo as soon as it arrives, so
+    the raw JSON is never buffered whole. Requires ijson.
+
+    Returns list of CommandInfo objects or None on error (like
+    run_catalog_command + parse_catalog)
+    """
+    import ijson
+    import shlex
+    import subprocess
+    import tempfile
+    import threading
+
+    debug_print(f"Streaming catalog command: {catalog_cmd}")
+
+    # stderr goes to a temp file: a second pipe could fill up and block
+    # picobox while we are still reading stdout
+    stderr = tempfile.TemporaryFile()
+    try:
+        proc = subprocess.Popen(
+            shlex.split(catalog_cmd),
+            stdout=subprocess.PIPE,
+            stderr=stderr
+        )
+    except Exception as e:
+        stderr.close()
+        debug_print(f"Error running catalog command: {e}")
+        return None
+
+    # Same 5 second budget as run_catalog_command
+    timer = threading.Timer(5, proc.kill)
+    timer.start()
+
+    try:
+        commands = [_command_from_json(cmd)
+                    for cmd in ijson.items(_check_catalog_events(ijson.parse(proc.stdout)),
+                                           'commands.item')]
+    except Exception as e:
+        debug_print(f"JSON parse error: {e}")
+        commands = None
+    finally:
+        proc.stdout.close()
+        proc.wait()
+        timer.cancel()
+
+    with stderr:
+        if proc.returncode != 0:
+            stderr.seek(0)
+            debug_print(f"Catalog command failed: {stderr.read().decode(errors='replace')}")
+            return None
+
+    if commands is not None:
+        debug_print(f"Loaded {len(commands)} commands")
+    return commands
+
+
+@lru_cache(maxsize=1)
+def _load_catalog_cached(catalog_cmd: str, fallback_file: str) -> Tuple[CommandInfo, ...]:
+    """
+    Load the command catalog once per (catalog command, fallback file)
+
+    Tries (in order):
+    1. Load the pickled catalog cached for the current picobox binary
+    2. Run catalog command (picobox --commands-json), streamed through
+       ijson when it is installed
+    3. Load from the fallback JSON file (also when the command's output
+       is not valid JSON)
+    4. Return empty tuple
+
+    The on-disk cache is only used with the default catalog command, since
+    a custom command's output can't be tied to a binary we can stat.
+
+    Returns tuple of CommandInfo objects
+    """
+    cache_path = None
+    if catalog_cmd == DEFAULT_CATALOG_CMD:
+        cache_path = _catalog_cache_path()
+
+    if cache_path:
+        commands = _read_catalog_cache(cache_path)
+        if commands is not None:
+            return tuple(commands)
+
+    # Try running catalog command
+    if _IJSON_AVAILABLE:
+        commands = stream_catalog_command(catalog_cmd)
+    else:
+        json_str = run_catalog_command(catalog_cmd)
+        commands = parse_catalog(json_str) if json_str else None
+
+    if commands is not None:
+        if commands and cache_path:
+            _write_catalog_cache(cache_path, commands)
+        return tuple(commands)
+
+    # Fallback to file
+    debug_print(f"Falling back to {fallback_file} file")
+    json_str = load_catalog_from_file(fallback_file)
+
+    if not json_str:
+        debug_print("No catalog available")
+        return ()
+
+    return tuple(parse_catalog(json_str) or ())
+
+
+def _catalog_source() -> Tuple[str, str]:
+    """Return the (catalog command, fallback file) pair keying the caches"""
+    return os.environ.get('MYSH_CATALOG_CMD', DEFAULT_CATALOG_CMD), "commands.json"
+
+
+def load_command_catalog() -> Tuple[CommandInfo, ...]:
+    """
+    Load the command catalog using available methods
+
+    Results are memoized per process on the catalog command (MYSH_CATALOG_CMD
+    or the default) and fallback file, so repeated calls don't re-exec
+    picobox. See _load_catalog_cached for the lookup order.
+
+    Returns tuple of CommandInfo objects
+    """
+    return _load_catalog_cached(*_catalog_source())
+
+
+@dataclass(slots=True)
+class CatalogIndex:
+    """
+    Inverted index over a catalog: word -> (command indices, weights)
+
+    Each weight is the score a word earns for that command (3 name + 2
+    summary + 1 description), so a query is scored by summing the postings
+    of its words. Postings are int32 numpy arrays when vectorized, plain
+    lists otherwise.
+    """
+    postings: Dict[str, Tuple[Any, Any]]
+    vectorized: bool = False
+
+
+# Importing numpy costs more than pure-Python scoring saves on small catalogs
+NUMPY_MIN_COMMANDS = 1000
+
+
+def build_inverted_index(catalog: Sequence[CommandInfo]) -> CatalogIndex:
+    """
+    Build the word -> postings index for a catalog
+
+    Returns CatalogIndex whose scores agree with score_command
+    """
+    postings: Dict[str, Tuple[List[int], List[int]]] = {}
 
+    for i, cmd in enumerate(catalog):
+        weights: Dict[str, int] = {}
+        for tok in cmd._name_tok:
+            weights[tok] = weights.get(tok, 0) + 3
+        for tok in cmd._sum_tok:
+            weights[tok] = weights.get(tok, 0) + 2
+        for tok in cmd._desc_tok:
+            weights[tok] = weights.get(tok, 0) + 1
 
-def score_command(query: str, cmd: CommandInfo) -> int:
+        for tok, weight in weights.items():
+            indices, tok_weights = postings.setdefault(tok, ([], []))
+            indices.append(i)
+            tok_weights.append(weight)
+
+    np = _numpy() if len(catalog) >= NUMPY_MIN_COMMANDS else None
+    if np is not None:
+        return CatalogIndex({
+            tok: (np.array(indices, dtype=np.int32), np.array(tok_weights, dtype=np.int32))
+            for tok, (indices, tok_weights) in postings.items()
+        }, vectorized=True)
+
+    return CatalogIndex(postings)
+
+
+@lru_cache(maxsize=1)
+def _load_index_cached(catalog_cmd: str, fallback_file: str) -> CatalogIndex:
+    """Build the inverted index once per loaded catalog"""
+    return build_inverted_index(_load_catalog_cached(catalog_cmd, fallback_file))
+
+
+def load_inverted_index() -> CatalogIndex:
+    """
+    Return the inverted index for the catalog load_command_catalog returns
+
+    Returns CatalogIndex (memoized like the catalog itself)
+    """
+    return _load_index_cached(*_catalog_source())
+
+
+# Building the index costs about as much as ~40 plain catalog scans
+# (measured on a 300-command catalog), so only large batches use it
+INDEX_MIN_QUERIES = 50
+
+
+def _index_for_batch(query_count: int) -> Optional[CatalogIndex]:
+    """
+    Return the inverted index if a batch is large enough to pay for it
+
+    The CLI scores one query per run, where building the index is far
+    slower than scanning the catalog with select_relevant_commands.
+
+    Returns CatalogIndex or None (scan the catalog instead)
+    """
+    if query_count < INDEX_MIN_QUERIES:
+        return None
+    return load_inverted_index()
+
+
+def _score_tokens(qset: FrozenSet[str], cmd: CommandInfo) -> int:
+    """Score a command against an already tokenized query (see score_command)"""
+    return (3 * len(qset & cmd._name_tok)
+            + 2 * len(qset & cmd._sum_tok)
+            + len(qset & cmd._desc_tok))
+
+
+def score_command(query: Union[str, _QueryCtx], cmd: CommandInfo) -> int:
     """
     Score a command's relevance to the query (simple keyword matching)
 
+    Query and command fields are compared as word sets, so "ls" matches
+    the word "ls" but not "false".
+
     Scoring:
     - Name match: 3 points per word
     - Summary match: 2 points per word
@@ -137,48 +553,151 @@ def score_command(query: str, cmd: CommandInfo) -> int:
 
     Returns integer score (higher = more relevant)
     """
-    query_lower = query.lower()
-    query_words = query_lower.split()
+    return _score_tokens(_query_ctx(query).tokenset, cmd)
+
+
+def score_all(query: Union[str, _QueryCtx], catalog: Sequence[CommandInfo],
+              index: CatalogIndex) -> Any:
+    """
+    Score every command in the catalog at once using its inverted index
+
+    Only postings of the query's words are touched, so the work is
+    proportional to the number of hits rather than the catalog size.
 
-    score = 0
+    Returns per-command scores (numpy int32 array if the index is
+    vectorized, else list)
+    """
+    postings = index.postings
+    qset = _query_ctx(query).tokenset
+
+    if index.vectorized:
+        np = _numpy()
+        scores = np.zeros(len(catalog), dtype=np.int32)
+        for word in qset:
+            hit = postings.get(word)
+            if hit is not None:
+                # Indices are unique within a posting, so fancy += is safe
+                scores[hit[0]] += hit[1]
+        return scores
+
+    scores = [0] * len(catalog)
+    for word in qset:
+        hit = postings.get(word)
+        if hit is not None:
+            for i, weight in zip(*hit):
+                scores[i] += weight
+    return scores
+
+
+def _top_k_indices(scores: Any, k: int) -> List[int]:
+    """
+    Indices of the k highest scores, best first
+
+    Ties are broken by catalog order, matching select_relevant_commands.
+    """
+    n = len(scores)
+    if k <= 0 or n == 0:
+        return []
 
-    # Score name matches (highest weight)
-    for word in query_words:
-        if word in cmd.name.lower():
-            score += 3
+    if isinstance(scores, list):
+        import heapq
+        return heapq.nlargest(k, range(n), key=scores.__getitem__)
 
-    # Score summary matches (medium weight)
-    summary_lower = cmd.summary.lower()
-    for word in query_words:
-        if word in summary_lower:
-            score += 2
+    np = _numpy()
 
-    # Score description matches (low weight)
-    desc_lower = cmd.description.lower()
-    for word in query_words:
-        if word in desc_lower:
-            score += 1
+    if k >= n:
+        top = np.arange(n)
+    else:
+        # k-th largest score; everything above it is in, ties fill by index
+        kth = np.partition(scores, n - k)[n - k]
+        above = np.flatnonzero(scores > kth)
+        tied = np.flatnonzero(scores == kth)[:k - len(above)]
+        top = np.concatenate((above, tied))
 
-    return score
+    return top[np.lexsort((top, -scores[top]))].tolist()
 
 
-def select_relevant_commands(query: str, catalog: List[CommandInfo], k: int = 5) -> List[CommandInfo]:
+def select_relevant_commands(query: Union[str, _QueryCtx], catalog: Sequence[CommandInfo], k: int = 5,
+                             index: Optional[CatalogIndex] = None) -> List[CommandInfo]:
     """
     Select the top k most relevant commands for the query (RAG retrieval)
 
+    Uses the inverted index (see score_all) when one is given.
+
     Returns list of CommandInfo objects, sorted by relevance
     """
-    # Score all commands
-    scored = [(cmd, score_command(query, cmd)) for cmd in catalog]
+    if index is not None:
+        return [catalog[i] for i in _top_k_indices(score_all(query, catalog, index), k)]
+
+    import heapq
+
+    qset = _query_ctx(query).tokenset
 
-    # Sort by score (descending)
-    scored.sort(key=lambda x: x[1], reverse=True)
+    # Partial selection, O(N log k); ties keep catalog order like a stable sort
+    return heapq.nlargest(k, catalog, key=lambda cmd: _score_tokens(qset, cmd))
 
-    # Return top k
-    return [cmd for cmd, score in scored[:k]]
 
+# Per-command character budgets for prompt context (fewer input tokens)
+MAX_SUMMARY_CHARS = 100
+MAX_DESC_CHARS = 200
 
-def build_prompt(query: str, catalog: List[CommandInfo]) -> str:
+
+def _max_desc_chars() -> int:
+    """Return the description budget (MYSH_LLM_MAX_DESC, <= 0 means no limit)"""
+    value = os.environ.get('MYSH_LLM_MAX_DESC')
+    if value is None:
+        return MAX_DESC_CHARS
+
+    try:
+        return int(value)
+    except ValueError:
+        debug_print(f"Ignoring invalid MYSH_LLM_MAX_DESC: {value!r}")
+        return MAX_DESC_CHARS
+
+
+def format_command_docs(commands: Sequence[CommandInfo]) -> str:
+    """
+    Format command documentation for the RAG context of a prompt
+
+    Summaries and descriptions are cut to MAX_SUMMARY_CHARS and
+    MYSH_LLM_MAX_DESC characters. They are truncated here rather than at
+    load time so retrieval still scores the full text.
+
+    Returns one Command/Summary/Description/Usage block per command
+    """
+    max_desc = _max_desc_chars()
+    truncated = 0
+
+    # Collect fragments and join once instead of repeated += concatenation
+    parts: List[str] = []
+    for cmd in commands:
+        summary = cmd.summary
+        if len(summary) > MAX_SUMMARY_CHARS:
+            summary = summary[:MAX_SUMMARY_CHARS]
+            truncated += 1
+
+        description = cmd.description
+        if 0 < max_desc < len(description):
+            description = description[:max_desc]
+            truncated += 1
+
+        if parts:
+            # Blank line between command blocks
+            parts.append("\n")
+        parts.extend(("Command: ", cmd.name, "\nSummary: ", summary, "\n"))
+        if description:
+            parts.extend(("Description: ", description, "\n"))
+        parts.extend(("Usage: ", cmd.usage, "\n"))
+
+    if truncated:
+        debug_print(f"Truncated {truncated} summary/description fields in prompt")
+
+    return "".join(parts)
+
+
+def build_prompt(query: Union[str, _QueryCtx], catalog: Sequence[CommandInfo],
+                 index: Optional[CatalogIndex] = None,
+                 relevant: Optional[Sequence[CommandInfo]] = None) -> str:
     """
     Build the prompt for the LLM
 
@@ -187,29 +706,24 @@ def build_prompt(query: str, catalog: List[CommandInfo]) -> str:
     - Relevant command documentation (RAG context)
     - User query
 
+    Pass relevant to reuse an earlier select_relevant_commands result.
+
     Returns formatted prompt string
     """
-    # Get top 5 relevant commands
-    relevant = select_relevant_commands(query, catalog, k=5)
+    query = _query_ctx(query)
 
-    # Build command documentation
-    cmd_docs = []
-    for cmd in relevant:
-        doc = f"Command: {cmd.name}\n"
-        doc += f"Summary: {cmd.summary}\n"
-        if cmd.description:
-            doc += f"Description: {cmd.description}\n"
-        doc += f"Usage: {cmd.usage}\n"
-        cmd_docs.append(doc)
+    # Get top 5 relevant commands
+    if relevant is None:
+        relevant = select_relevant_commands(query, catalog, k=5, index=index)
 
-    context = "\n".join(cmd_docs)
+    context = format_command_docs(relevant)
 
     prompt = f"""You are a Unix shell command expert. Given the user's request, suggest the most appropriate command.
 
 Available Commands:
 {context}
 
-User Request: {query}
+User Request: {query.raw}
 
 Respond with ONLY the shell command, no explanation. The command should:
 - Use commands from the list above
@@ -222,155 +736,643 @@ Command:"""
     return prompt
 
 
-def call_llm(prompt: str) -> Optional[str]:
+# Completion tokens budgeted per answer in a batch prompt
+BATCH_TOKENS_PER_QUERY = 100
+# gpt-4o-mini accepts at most 16384 completion tokens; smaller batches also
+# keep the union of retrieved docs short
+MAX_COMPLETION_TOKENS = 16384
+BATCH_MAX_QUERIES = 50
+
+
+def build_batch_prompt(queries: Sequence[Union[str, _QueryCtx]], catalog: Sequence[CommandInfo],
+                       index: Optional[CatalogIndex] = None,
+                       relevant: Optional[Sequence[Sequence[CommandInfo]]] = None) -> str:
+    """
+    Build one LLM prompt that asks for a command for each of several queries
+
+    The RAG context is the union of each query's top 5 commands, so the
+    shared instructions and documentation are sent once for all queries.
+    Answers are requested as a numbered list (see parse_batch_response).
+    Pass relevant (one list per query) to reuse earlier retrieval results.
+
+    Returns formatted prompt string
+    """
+    queries = [_query_ctx(query) for query in queries]
+    if relevant is None:
+        relevant = [select_relevant_commands(query, catalog, k=5, index=index)
+                    for query in queries]
+
+    union: Dict[int, CommandInfo] = {}
+    for commands in relevant:
+        for cmd in commands:
+            union.setdefault(id(cmd), cmd)
+
+    context = format_command_docs(list(union.values()))
+
+    # One line per query keeps the numbering unambiguous
+    numbered = "\n".join(f"{i}. {' '.join(query.raw.split())}"
+                         for i, query in enumerate(queries, 1))
+
+    prompt = f"""You are a Unix shell command expert. Given each of the user's requests, suggest the most appropriate command.
+
+Available Commands:
+{context}
+
+User Requests:
+{numbered}
+
+Return one command per line in the same order, numbered to match the requests (e.g. "1. ls"), with no explanation. Each command should:
+- Use commands from the list above
+- Be a valid single-line command
+- Use proper syntax (pipes, redirects allowed)
+- Be executable as-is
+
+Commands:"""
+
+    return prompt
+
+
+# [ \t] rather than \s: an empty numbered line must not swallow the next one
+_BATCH_LINE_RE = re.compile(r'^[ \t]*(\d+)[.)][ \t]*(.*)$', re.M)
+
+
+def parse_batch_response(response: str, count: int) -> List[Optional[str]]:
+    """
+    Parse the numbered answers to a build_batch_prompt prompt
+
+    Empty and out-of-range numbered lines are ignored; if a number repeats,
+    its first non-empty answer wins.
+
+    Returns list of count suggestions, None where the model gave no answer
+    """
+    answers: List[Optional[str]] = [None] * count
+
+    for match in _BATCH_LINE_RE.finditer(response):
+        number = int(match.group(1))
+        answer = match.group(2).strip()
+        if answer and 1 <= number <= count and answers[number - 1] is None:
+            answers[number - 1] = answer
+
+    return answers
+
+
+OPENAI_CHAT_URL = 'https://api.openai.com/v1/chat/completions'
+
+SYSTEM_PROMPT = "You are a Unix shell command expert. Respond with only the command, no explanation."
+
+
+def _api_key() -> Optional[str]:
+    """Return the OpenAI API key (OPENAI_API_KEY or AI_SHELL), if any"""
+    return os.environ.get('OPENAI_API_KEY') or os.environ.get('AI_SHELL')
+
+
+def _llm_model() -> str:
+    """Return the configured OpenAI model (MYSH_LLM_MODEL)"""
+    return os.environ.get('MYSH_LLM_MODEL', 'gpt-4o-mini')
+
+
+def _chat_request_body(model: str, prompt: str, max_tokens: int = 100) -> Dict[str, Any]:
+    """Build the chat completions request body shared by all transports"""
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.3,
+        "max_tokens": max_tokens
+    }
+
+
+# Markdown code fences the model sometimes wraps its whole answer in
+_FENCE_RE = re.compile(r'^```\w*[ \t]*\n|\n```[ \t]*$|^```|```$')
+
+
+def _clean_suggestion(content: str) -> str:
+    """Strip surrounding whitespace and ```lang ... ``` fences from LLM output"""
+    return _FENCE_RE.sub('', content.strip()).strip()
+
+
+def _suggestion_from_response(data: Dict[str, Any]) -> Optional[str]:
+    """
+    Extract the suggestion from a decoded chat completions response
+
+    Returns suggested command string or None on API error
+    """
+    if 'choices' in data:
+        suggestion = _clean_suggestion(data['choices'][0]['message']['content'])
+        debug_print(f"LLM suggestion: {suggestion}")
+        return suggestion
+    elif 'error' in data:
+        debug_print(f"API error: {data['error']}")
+    return None
+
+
+@lru_cache(maxsize=1)
+def _http_client() -> Any:
+    """
+    Shared httpx client, so repeated calls reuse one TCP+TLS connection
+
+    Raises ImportError if httpx is not installed
+    """
+    import httpx
+
+    try:
+        return httpx.Client(timeout=30, http2=True)
+    except ImportError:
+        # http2=True needs the optional h2 package
+        return httpx.Client(timeout=30)
+
+
+def _call_llm_httpx(client: Any, api_key: str, body: Dict[str, Any]) -> Optional[str]:
+    """POST the request over the shared httpx client"""
+    response = client.post(
+        OPENAI_CHAT_URL,
+        headers={
+            'Authorization': f'Bearer {api_key}',
+            'Content-Type': 'application/json'
+        },
+        content=_dumps(body)
+    )
+    return _suggestion_from_response(_loads(response.content))
+
+
+def _call_llm_curl(api_key: str, body: Dict[str, Any]) -> Optional[str]:
+    """POST the request by spawning curl (used when httpx is missing)"""
+    import subprocess
+
+    # The body is piped on stdin (-d @-), so no temp file is written
+    result = subprocess.run([
+        'curl',
+        '-s',
+        OPENAI_CHAT_URL,
+        '-H', f'Authorization: Bearer {api_key}',
+        '-H', 'Content-Type: application/json',
+        '-d', '@-'
+    ], input=_dumps(body), capture_output=True, text=True, timeout=30)
+
+    if result.returncode == 0:
+        return _suggestion_from_response(_loads(result.stdout))
+    return None
+
+
+def call_llm(prompt: str, max_tokens: int = 100) -> Optional[str]:
     """
     Call OpenAI API to get command suggestion
 
+    Uses the openai library if installed, else a pooled httpx client, and
+    curl as a last resort.
+
     Returns suggested command string or None on error/not configured
     """
-    api_key = os.environ.get('OPENAI_API_KEY') or os.environ.get('AI_SHELL')
+    api_key = _api_key()
 
     if not api_key:
         debug_print("No OpenAI API key found (OPENAI_API_KEY or AI_SHELL)")
         return None
 
-    model = os.environ.get('MYSH_LLM_MODEL', 'gpt-4o-mini')
+    body = _chat_request_body(_llm_model(), prompt, max_tokens)
 
     try:
         # Use openai library if available
         try:
             import openai
+        except ImportError:
+            openai = None
+
+        if openai is not None:
             client = openai.OpenAI(api_key=api_key)
 
-            response = client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": "You are a Unix shell command expert. Respond with only the command, no explanation."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=100
-            )
+            response = client.chat.completions.create(**body)
 
-            suggestion = response.choices[0].message.content.strip()
+            suggestion = _clean_suggestion(response.choices[0].message.content)
             debug_print(f"LLM suggestion: {suggestion}")
             return suggestion
 
+        try:
+            http = _http_client()
         except ImportError:
-            # Fallback to curl
-            debug_print("openai library not found, using curl")
-
-            import tempfile
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-                json.dump({
-                    "model": model,
-                    "messages": [
-                        {"role": "system", "content": "You are a Unix shell command expert. Respond with only the command, no explanation."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": 0.3,
-                    "max_tokens": 100
-                }, f)
-                request_file = f.name
-
-            try:
-                result = subprocess.run([
-                    'curl',
-                    '-s',
-                    'https://api.openai.com/v1/chat/completions',
-                    '-H', f'Authorization: Bearer {api_key}',
-                    '-H', 'Content-Type: application/json',
-                    '-d', f'@{request_file}'
-                ], capture_output=True, text=True, timeout=30)
-
-                if result.returncode == 0:
-                    data = json.loads(result.stdout)
-                    if 'choices' in data:
-                        suggestion = data['choices'][0]['message']['content'].strip()
-                        debug_print(f"LLM suggestion: {suggestion}")
-                        return suggestion
-                    elif 'error' in data:
-                        debug_print(f"API error: {data['error']}")
-                        return None
-            finally:
-                os.unlink(request_file)
+            http = None
+
+        if http is not None:
+            debug_print("openai library not found, using httpx")
+            return _call_llm_httpx(http, api_key, body)
+
+        # Fallback to curl
+        debug_print("openai and httpx libraries not found, using curl")
+        return _call_llm_curl(api_key, body)
+
+    except Exception as e:
+        debug_print(f"LLM call failed: {e}")
+        return None
+
+
+def _response_cache_path(model: str, prompt: str) -> str:
+    """Path of the cached LLM response for (model, prompt)"""
+    import hashlib
+
+    key = hashlib.blake2b(f"{model}\n{prompt}".encode(), digest_size=16).hexdigest()
+    return os.path.join(cache_dir(), 'responses', key)
+
+
+def _read_response_cache(path: str) -> Optional[str]:
+    """
+    Return the cached suggestion at path, or None on a cache miss
+
+    Entries are cleaned on read as well, since ones written before
+    _clean_suggestion existed may still hold code fences.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            suggestion = _clean_suggestion(f.read())
+    except OSError:
+        return None
+    except ValueError as e:
+        # UnicodeDecodeError: a corrupt entry is just a miss
+        debug_print(f"Ignoring unreadable response cache {path}: {e}")
+        return None
+
+    if not suggestion:
+        return None
+
+    debug_print(f"LLM suggestion from cache: {suggestion}")
+    return suggestion
+
+
+def _write_response_cache(path: str, suggestion: Optional[str]) -> None:
+    """Store a successful suggestion at path (errors are logged, never raised)"""
+    if not suggestion:
+        return
+
+    try:
+        _atomic_write(path, suggestion.encode('utf-8'))
+    except OSError as e:
+        debug_print(f"Failed to write response cache {path}: {e}")
+
+
+def _cached_call_llm(prompt: str, max_tokens: int = 100) -> Optional[str]:
+    """
+    call_llm memoized on disk by (model, prompt)
+
+    Repeated queries are answered from ~/.cache/mysh_llm/responses/ without
+    a network round-trip. Only successful suggestions are stored. Set
+    MYSH_LLM_NOCACHE=1 to always call the API.
+
+    Returns suggested command string or None on error/not configured
+    """
+    if os.environ.get('MYSH_LLM_NOCACHE') == '1':
+        return call_llm(prompt, max_tokens)
+
+    path = _response_cache_path(_llm_model(), prompt)
+
+    suggestion = _read_response_cache(path)
+    if suggestion is not None:
+        return suggestion
+
+    suggestion = call_llm(prompt, max_tokens)
+    _write_response_cache(path, suggestion)
+
+    return suggestion
+
+
+def _env_limit(name: str, default: float, cast: Callable[[str], float]) -> float:
+    """
+    Read a numeric limit from the environment, clamped to at least 1
+
+    A zero concurrency would block every request forever and a negative
+    rate would never refill, so values below 1 are raised to 1. Invalid
+    values fall back to default.
+    """
+    value = os.environ.get(name)
+    if value is None:
+        return default
+
+    try:
+        number = cast(value)
+    except ValueError:
+        debug_print(f"Ignoring invalid {name}: {value!r}")
+        return default
+
+    # NaN compares false against everything, so it would slip past max()
+    if number != number:
+        debug_print(f"Ignoring invalid {name}: {value!r}")
+        return default
+
+    return max(number, 1)
+
+
+class _TokenBucket:
+    """
+    Async token bucket holding up to per_minute tokens, refilled continuously
+
+    Used to keep parallel LLM calls under the API's RPM/TPM rate limits.
+    """
+
+    def __init__(self, per_minute: float) -> None:
+        import time
+
+        self._clock = time.monotonic
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.rate = per_minute / 60.0
+        self.updated = self._clock()
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        """Wait until amount tokens are available, then take them"""
+        import asyncio
+
+        # A request larger than the bucket would otherwise wait forever
+        amount = min(amount, self.capacity)
+
+        while True:
+            now = self._clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return
+
+            await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+async def _call_llm_async(client: Any, api_key: str, prompt: str, semaphore: Any,
+                          rpm: _TokenBucket, tpm: _TokenBucket) -> Optional[str]:
+    """
+    Async counterpart of call_llm over a shared httpx.AsyncClient
+
+    Returns suggested command string or None on error
+    """
+    body = _chat_request_body(_llm_model(), prompt)
+
+    # Rough token estimate: ~4 characters per prompt token plus the reply
+    estimated_tokens = len(prompt) // 4 + body["max_tokens"]
+
+    try:
+        async with semaphore:
+            await rpm.acquire()
+            await tpm.acquire(estimated_tokens)
+
+            response = await client.post(
+                OPENAI_CHAT_URL,
+                headers={
+                    'Authorization': f'Bearer {api_key}',
+                    'Content-Type': 'application/json'
+                },
+                content=_dumps(body)
+            )
+
+        return _suggestion_from_response(_loads(response.content))
 
     except Exception as e:
         debug_print(f"LLM call failed: {e}")
         return None
 
 
-def heuristic_suggestion(query: str, catalog: List[CommandInfo]) -> str:
+async def _gather_llm_async(api_key: str, prompts: Sequence[str]) -> List[Optional[str]]:
+    """Fire one request per prompt concurrently, bounded by the configured limits"""
+    import asyncio
+    import httpx
+
+    semaphore = asyncio.Semaphore(int(_env_limit('MYSH_LLM_CONCURRENCY', 10, int)))
+    rpm = _TokenBucket(_env_limit('MYSH_LLM_RPM', 500.0, float))
+    tpm = _TokenBucket(_env_limit('MYSH_LLM_TPM', 200000.0, float))
+
+    async with httpx.AsyncClient(timeout=30) as client:
+        return list(await asyncio.gather(*(
+            _call_llm_async(client, api_key, prompt, semaphore, rpm, tpm)
+            for prompt in prompts
+        )))
+
+
+async def call_llm_parallel_async(prompts: Sequence[str]) -> List[Optional[str]]:
+    """
+    Coroutine form of call_llm_parallel
+
+    Await this from code that already runs an event loop (e.g. a REPL
+    embedding mysh_llm), where call_llm_parallel's asyncio.run would raise
+    RuntimeError. Without httpx the requests run sequentially and block
+    the loop.
+
+    Returns list of suggestions (None on error/not configured), one per prompt
+    """
+    use_cache = os.environ.get('MYSH_LLM_NOCACHE') != '1'
+    model = _llm_model()
+
+    answers: List[Optional[str]] = [None] * len(prompts)
+    paths: Dict[int, str] = {}
+    pending: List[int] = []
+
+    # Cache first, like _cached_call_llm: hits are served even without a key
+    for i, prompt in enumerate(prompts):
+        if use_cache:
+            paths[i] = _response_cache_path(model, prompt)
+            answers[i] = _read_response_cache(paths[i])
+        if answers[i] is None:
+            pending.append(i)
+
+    if not pending:
+        return answers
+
+    api_key = _api_key()
+
+    if not api_key:
+        debug_print("No OpenAI API key found (OPENAI_API_KEY or AI_SHELL)")
+        return answers
+
+    try:
+        import httpx  # noqa: F401
+    except ImportError:
+        debug_print("httpx library not found, calling LLM sequentially")
+        results = [call_llm(prompts[i]) for i in pending]
+    else:
+        results = await _gather_llm_async(api_key, [prompts[i] for i in pending])
+
+    for i, suggestion in zip(pending, results):
+        answers[i] = suggestion
+        if use_cache:
+            _write_response_cache(paths[i], suggestion)
+
+    return answers
+
+
+def call_llm_parallel(prompts: Sequence[str]) -> List[Optional[str]]:
+    """
+    Call the LLM for several prompts concurrently
+
+    Network I/O overlaps, so total latency is about that of the slowest
+    request rather than the sum. Cached responses are reused and new ones
+    stored, as with _cached_call_llm. Falls back to sequential calls when
+    httpx is not installed.
+
+    Runs its own event loop, so it raises RuntimeError when called from a
+    running one; await call_llm_parallel_async there instead.
+
+    Returns list of suggestions (None on error/not configured), one per prompt
+    """
+    import asyncio
+
+    return asyncio.run(call_llm_parallel_async(prompts))
+
+
+def _list_handler(tokens: FrozenSet[str]) -> str:
+    """List/show files, including hidden ones when asked for"""
+    if tokens & {'all', 'hidden'}:
+        return 'ls -la'
+    return 'ls'
+
+
+# Keyword rules for heuristic_suggestion, checked in priority order
+_HEURISTICS: Tuple[Tuple[FrozenSet[str], Callable[[FrozenSet[str]], str]], ...] = (
+    # List/show files
+    (frozenset({'list', 'show', 'files', 'directory'}), _list_handler),
+    # Find
+    (frozenset({'find'}), lambda tokens: 'find .'),
+    # Count/lines
+    (frozenset({'count', 'lines'}), lambda tokens: 'wc -l'),
+    # Search/grep
+    (frozenset({'search', 'grep'}), lambda tokens: 'grep'),
+)
+
+
+def heuristic_suggestion(query: Union[str, _QueryCtx], catalog: Sequence[CommandInfo],
+                         index: Optional[CatalogIndex] = None,
+                         relevant: Optional[Sequence[CommandInfo]] = None) -> str:
     """
     Generate a basic command suggestion using heuristics (no LLM)
 
     This is the fallback when OpenAI API is not available.
-    Uses simple keyword matching to pick the most relevant command.
+    Uses simple keyword matching (whole words, see _HEURISTICS), else
+    picks the most relevant command.
+    Pass relevant to reuse an earlier select_relevant_commands result
+    (only its first entry is used).
 
     Returns command string
     """
     if not catalog:
         return "echo 'No commands available'"
 
+    tokens = _query_ctx(query).tokenset
+
+    # Simple heuristics based on query
+    for keywords, handler in _HEURISTICS:
+        if tokens & keywords:
+            return handler(tokens)
+
     # Get most relevant command
-    relevant = select_relevant_commands(query, catalog, k=1)
+    if relevant is None:
+        relevant = select_relevant_commands(query, catalog, k=1, index=index)
 
     if relevant:
-        cmd = relevant[0]
+        # Default: just return the command name
+        return relevant[0].name
 
-        # Simple heuristics based on query
-        query_lower = query.lower()
+    return 'help'
 
-        # List/show files
-        if any(word in query_lower for word in ['list', 'show', 'files', 'directory']):
-            if 'all' in query_lower or 'hidden' in query_lower:
-                return 'ls -la'
-            return 'ls'
 
-        # Find
-        if 'find' in query_lower:
-            return 'find .'
+def _fill_with_heuristics(queries: Sequence[_QueryCtx], answers: Sequence[Optional[str]],
+                          catalog: Sequence[CommandInfo],
+                          relevant: Sequence[Sequence[CommandInfo]]) -> List[str]:
+    """Replace missing LLM answers with heuristic_suggestion for their query"""
+    suggestions = []
+    for query, suggestion, commands in zip(queries, answers, relevant):
+        if not suggestion:
+            debug_print(f"Using heuristic fallback for: {query.raw}")
+            suggestion = heuristic_suggestion(query, catalog, relevant=commands)
+        suggestions.append(suggestion)
 
-        # Count/lines
-        if 'count' in query_lower or 'lines' in query_lower:
-            return 'wc -l'
+    return suggestions
 
-        # Search/grep
-        if 'search' in query_lower or 'grep' in query_lower:
-            return 'grep'
 
-        # Default: just return the command name
-        return cmd.name
+def _prepare_queries(queries: Sequence[str], catalog: Sequence[CommandInfo],
+                     index: Optional[CatalogIndex]) -> Tuple[List[_QueryCtx], List[List[CommandInfo]]]:
+    """
+    Preprocess each query once and retrieve its top 5 commands
 
-    return 'help'
+    The results feed both the prompt and the heuristic fallback, so neither
+    re-tokenizes the query or rescans the catalog.
+    """
+    ctxs = [_query_ctx(query) for query in queries]
+    relevant = [select_relevant_commands(ctx, catalog, k=5, index=index) for ctx in ctxs]
+    return ctxs, relevant
 
 
-def suggest_command(query: str) -> str:
+def suggest_commands(queries: Sequence[str]) -> List[str]:
     """
-    Main function: suggest a command for the given query
+    Suggest a command for each of several queries with few LLM calls
 
     Process:
     1. Load command catalog
-    2. Try LLM (if API key available)
-    3. Fall back to heuristic
+    2. Try LLM (if API key available): one prompt per BATCH_MAX_QUERIES
+       queries, so max_tokens stays within MAX_COMPLETION_TOKENS
+    3. Fall back to heuristic for any query left without an answer
 
-    Returns suggested command string
+    A single query uses the regular build_prompt prompt.
+
+    Returns list of suggested command strings, one per query
     """
+    if not queries:
+        return []
+
     # Load catalog
     catalog = load_command_catalog()
+    index = _index_for_batch(len(queries))
+    ctxs, relevant = _prepare_queries(queries, catalog, index)
 
-    # Build prompt
-    prompt = build_prompt(query, catalog)
+    # Try LLM first
+    if len(ctxs) == 1:
+        answers = [_cached_call_llm(build_prompt(ctxs[0], catalog, relevant=relevant[0]))]
+    else:
+        answers = []
+        for start in range(0, len(ctxs), BATCH_MAX_QUERIES):
+            chunk = ctxs[start:start + BATCH_MAX_QUERIES]
+            prompt = build_batch_prompt(chunk, catalog, relevant=relevant[start:start + BATCH_MAX_QUERIES])
+            max_tokens = min(BATCH_TOKENS_PER_QUERY * len(chunk), MAX_COMPLETION_TOKENS)
+            response = _cached_call_llm(prompt, max_tokens=max_tokens)
+            if response:
+                answers.extend(parse_batch_response(response, len(chunk)))
+            else:
+                answers.extend([None] * len(chunk))
+
+    # Fall back to heuristic
+    return _fill_with_heuristics(ctxs, answers, catalog, relevant)
+
+
+def suggest_commands_parallel(queries: Sequence[str]) -> List[str]:
+    """
+    Suggest a command for each query with one concurrent LLM call per query
+
+    Unlike suggest_commands, every query gets its own regular build_prompt
+    prompt; the requests run concurrently (see call_llm_parallel).
+
+    Returns list of suggested command strings, one per query
+    """
+    if not queries:
+        return []
+
+    # Load catalog
+    catalog = load_command_catalog()
+    index = _index_for_batch(len(queries))
+    ctxs, relevant = _prepare_queries(queries, catalog, index)
 
     # Try LLM first
-    suggestion = call_llm(prompt)
+    answers = call_llm_parallel([build_prompt(ctx, catalog, relevant=commands)
+                                 for ctx, commands in zip(ctxs, relevant)])
 
     # Fall back to heuristic
-    if not suggestion:
-        debug_print("Using heuristic fallback")
-        suggestion = heuristic_suggestion(query, catalog)
+    return _fill_with_heuristics(ctxs, answers, catalog, relevant)
 
-    return suggestion
+
+def suggest_command(query: str) -> str:
+    """
+    Main function: suggest a command for the given query
+
+    Thin wrapper over suggest_commands with a one-element batch; see there
+    for the process.
+
+    Returns suggested command string
+    """
+    return suggest_commands([query])[0]
 
 
 def main(argv: List[str]) -> int:
@@ -0,0 +1,318 @@
+"""
+Unit tests for mysh_llm.py
+Run: python3 -m unittest discover -s tests
+"""
+
+import asyncio
+import importlib.util
+import os
+import pickle
+import random
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import mysh_llm  # noqa: E402
+
+
+class ParseBatchResponseTest(unittest.TestCase):
+
+    def test_in_order(self):
+        response = "1. ls\n2) grep foo\n3. wc -l"
+        self.assertEqual(mysh_llm.parse_batch_response(response, 3),
+                         ['ls', 'grep foo', 'wc -l'])
+
+    def test_empty_line_does_not_take_next(self):
+        self.assertEqual(mysh_llm.parse_batch_response("1. ls\n2.\n3. pwd", 3),
+                         ['ls', None, 'pwd'])
+        self.assertEqual(mysh_llm.parse_batch_response("1. ls\n2) grep foo\n3. \n10. x", 3),
+                         ['ls', 'grep foo', None])
+
+    def test_skipped_number(self):
+        self.assertEqual(mysh_llm.parse_batch_response("1. ls\n3. pwd", 3),
+                         ['ls', None, 'pwd'])
+
+    def test_duplicate_keeps_first_answer(self):
+        self.assertEqual(mysh_llm.parse_batch_response("1. ls\n1. pwd\n2. \n2. cat", 2),
+                         ['ls', 'cat'])
+
+    def test_out_of_range(self):
+        self.assertEqual(mysh_llm.parse_batch_response("0. rm\n1. ls\n4. pwd", 2),
+                         ['ls', None])
+
+    def test_no_numbered_lines(self):
+        self.assertEqual(mysh_llm.parse_batch_response("", 2), [None, None])
+        self.assertEqual(mysh_llm.parse_batch_response("ls\npwd", 2), [None, None])
+
+
+class SuggestCommandsBatchTest(unittest.TestCase):
+
+    def fake_llm(self, prompt, max_tokens=100):
+        """Echo each numbered request back as its answer, recording max_tokens"""
+        self.max_tokens.append(max_tokens)
+        requests = prompt.split('User Requests:\n')[1].split('\n\n')[0]
+        return '\n'.join(f"{line.split('. ', 1)[0]}. echo {line.split('. ', 1)[1]}"
+                         for line in requests.splitlines())
+
+    def test_large_batch_is_chunked(self):
+        self.max_tokens = []
+        queries = [f"q{i}" for i in range(400)]
+        catalog = (mysh_llm.CommandInfo('ls', 'List files', 'List directory contents', 'ls'),)
+
+        with mock.patch.object(mysh_llm, 'load_command_catalog', return_value=catalog), \
+                mock.patch.object(mysh_llm, '_cached_call_llm', side_effect=self.fake_llm):
+            answers = mysh_llm.suggest_commands(queries)
+
+        self.assertEqual(answers, [f"echo {query}" for query in queries])
+        self.assertGreater(len(self.max_tokens), 1)
+        self.assertLessEqual(max(self.max_tokens), mysh_llm.MAX_COMPLETION_TOKENS)
+
+
+class InvertedIndexTest(unittest.TestCase):
+    """Indexed retrieval must match the heapq.nlargest scan, ties included"""
+
+    WORDS = 'list files show count lines search disk the of'.split()
+    QUERIES = ['list files', 'show the disk', 'count lines of files', 'search', 'nothing here', '']
+
+    def catalog(self, n):
+        # A tiny vocabulary, so most commands tie with many others
+        rng = random.Random(n)
+        return tuple(mysh_llm.CommandInfo(f"{rng.choice(self.WORDS)}{i}",
+                                          ' '.join(rng.choices(self.WORDS, k=3)),
+                                          ' '.join(rng.choices(self.WORDS, k=5)),
+                                          'usage')
+                     for i in range(n))
+
+    def check_matches_scan(self, catalog, vectorized):
+        index = mysh_llm.build_inverted_index(catalog)
+        self.assertEqual(index.vectorized, vectorized)
+
+        for query in self.QUERIES:
+            for k in (1, 5, len(catalog) + 3):
+                with self.subTest(query=query, k=k):
+                    self.assertEqual(mysh_llm.select_relevant_commands(query, catalog, k, index=index),
+                                     mysh_llm.select_relevant_commands(query, catalog, k))
+
+    def test_pure_python_index(self):
+        with mock.patch.object(mysh_llm, 'NUMPY_MIN_COMMANDS', 10 ** 9):
+            self.check_matches_scan(self.catalog(300), vectorized=False)
+
+    @unittest.skipUnless(importlib.util.find_spec('numpy'), "numpy not installed")
+    def test_numpy_index(self):
+        self.check_matches_scan(self.catalog(mysh_llm.NUMPY_MIN_COMMANDS + 500), vectorized=True)
+
+
+class CatalogCacheTest(unittest.TestCase):
+
+    def test_round_trip_stores_plain_tuples(self):
+        commands = [mysh_llm.CommandInfo('ls', 'List files', 'List directory contents', 'ls [FILE]...')]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'catalog.pkl')
+            mysh_llm._write_catalog_cache(path, commands)
+
+            # No class reference, so __main__ and mysh_llm can share the file
+            with open(path, 'rb') as f:
+                self.assertEqual(pickle.load(f), [('ls', 'List files', 'List directory contents', 'ls [FILE]...')])
+
+            self.assertEqual(mysh_llm._read_catalog_cache(path), commands)
+
+
+class CatalogCommandTest(unittest.TestCase):
+    """Streamed (ijson) and buffered catalog loading must agree"""
+
+    FALLBACK = b'{"commands": [{"name": "ls", "summary": "List files"}]}'
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.fallback = os.path.join(self.tmp.name, 'commands.json')
+        with open(self.fallback, 'wb') as f:
+            f.write(self.FALLBACK)
+        self.ijson = mysh_llm._IJSON_AVAILABLE
+
+    def tearDown(self):
+        mysh_llm._IJSON_AVAILABLE = self.ijson
+        self.tmp.cleanup()
+
+    def load(self, script, streamed):
+        mysh_llm._IJSON_AVAILABLE = streamed
+        catalog_cmd = f"{sys.executable} -c '{script}'"
+        # Bypass the lru_cache so each call really runs the command
+        return [cmd.name for cmd in mysh_llm._load_catalog_cached.__wrapped__(catalog_cmd, self.fallback)]
+
+    def check_both_paths(self, script, expected):
+        self.assertEqual(self.load(script, False), expected)
+        if self.ijson:
+            self.assertEqual(self.load(script, True), expected)
+
+    def test_valid_output(self):
+        self.check_both_paths('print("{\\"commands\\": [{\\"name\\": \\"cat\\"}]}")', ['cat'])
+
+    def test_invalid_json_falls_back_to_file(self):
+        self.check_both_paths('print("not json")', ['ls'])
+
+    def test_wrong_shape_falls_back_to_file(self):
+        self.check_both_paths('print("[]")', ['ls'])
+        self.check_both_paths('print("{\\"commands\\": [1]}")', ['ls'])
+        self.check_both_paths('print("{\\"commands\\": {\\"name\\": 1}}")', ['ls'])
+        self.check_both_paths('print("{\\"commands\\": null}")', ['ls'])
+
+    def test_missing_commands_is_empty(self):
+        self.check_both_paths('print("{}")', [])
+
+    def test_failure_falls_back_to_file(self):
+        self.check_both_paths('import sys; sys.exit("broken")', ['ls'])
+
+
+class CleanSuggestionTest(unittest.TestCase):
+
+    def test_plain(self):
+        self.assertEqual(mysh_llm._clean_suggestion("  ls -la \n"), 'ls -la')
+
+    def test_fenced_block(self):
+        self.assertEqual(mysh_llm._clean_suggestion("```bash\nls -la\n```"), 'ls -la')
+        self.assertEqual(mysh_llm._clean_suggestion("```\nls -la\n```"), 'ls -la')
+
+    def test_single_line_fence(self):
+        self.assertEqual(mysh_llm._clean_suggestion("```ls -la```"), 'ls -la')
+
+    def test_inline_backticks_kept(self):
+        self.assertEqual(mysh_llm._clean_suggestion("echo `date`"), 'echo `date`')
+        self.assertEqual(mysh_llm._clean_suggestion("echo hi\n```\nls"), 'echo hi\n```\nls')
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'entry')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, data):
+        with open(self.path, 'wb') as f:
+            f.write(data)
+
+    def test_round_trip(self):
+        mysh_llm._write_response_cache(self.path, 'ls -la')
+        self.assertEqual(mysh_llm._read_response_cache(self.path), 'ls -la')
+
+    def test_missing_is_miss(self):
+        self.assertIsNone(mysh_llm._read_response_cache(self.path))
+
+    def test_undecodable_is_miss(self):
+        self.write(b'\xff\xfe ls')
+        self.assertIsNone(mysh_llm._read_response_cache(self.path))
+
+    def test_old_fenced_entry_is_cleaned(self):
+        self.write(b'```bash\nls -la\n```')
+        self.assertEqual(mysh_llm._read_response_cache(self.path), 'ls -la')
+
+    def test_blank_entry_is_miss(self):
+        self.write(b'```\n```')
+        self.assertIsNone(mysh_llm._read_response_cache(self.path))
+
+
+class ParallelCacheTest(unittest.TestCase):
+    """call_llm_parallel serves cache hits like _cached_call_llm"""
+
+    PROMPT = 'list files'
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        env = {k: v for k, v in os.environ.items()
+               if k not in ('OPENAI_API_KEY', 'AI_SHELL', 'MYSH_LLM_NOCACHE')}
+        self.patches = [mock.patch.dict(os.environ, env, clear=True),
+                        mock.patch.object(mysh_llm, 'cache_dir', return_value=self.tmp.name)]
+        for patch in self.patches:
+            patch.start()
+        path = mysh_llm._response_cache_path(mysh_llm._llm_model(), self.PROMPT)
+        mysh_llm._write_response_cache(path, 'ls -la')
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+        self.tmp.cleanup()
+
+    def test_cache_hit_without_api_key(self):
+        self.assertEqual(mysh_llm._cached_call_llm(self.PROMPT), 'ls -la')
+        self.assertEqual(mysh_llm.call_llm_parallel([self.PROMPT, 'uncached']), ['ls -la', None])
+
+    def test_async_entry_point_inside_running_loop(self):
+        async def embedded():
+            return await mysh_llm.call_llm_parallel_async([self.PROMPT])
+
+        self.assertEqual(asyncio.run(embedded()), ['ls -la'])
+
+
+class EnvLimitTest(unittest.TestCase):
+
+    def setUp(self):
+        self._saved = os.environ.pop('MYSH_LLM_RPM', None)
+
+    def tearDown(self):
+        os.environ.pop('MYSH_LLM_RPM', None)
+        if self._saved is not None:
+            os.environ['MYSH_LLM_RPM'] = self._saved
+
+    def limit(self, value, cast=float):
+        if value is not None:
+            os.environ['MYSH_LLM_RPM'] = value
+        return mysh_llm._env_limit('MYSH_LLM_RPM', 500, cast)
+
+    def test_unset_uses_default(self):
+        self.assertEqual(self.limit(None), 500)
+
+    def test_valid_value(self):
+        self.assertEqual(self.limit('60'), 60)
+        self.assertEqual(self.limit('4', int), 4)
+
+    def test_invalid_value_uses_default(self):
+        self.assertEqual(self.limit('abc'), 500)
+        self.assertEqual(self.limit('nan'), 500)
+        self.assertEqual(self.limit('2.5', int), 500)
+
+    def test_clamped_to_one(self):
+        self.assertEqual(self.limit('0', int), 1)
+        self.assertEqual(self.limit('-30'), 1)
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_takes_available_tokens_without_waiting(self):
+        bucket = mysh_llm._TokenBucket(60)
+
+        async def run():
+            await bucket.acquire(60)
+
+        asyncio.run(asyncio.wait_for(run(), timeout=1))
+        self.assertLess(bucket.tokens, 1)
+
+    def test_waits_for_refill(self):
+        # 6000 per minute refills 100 tokens a second
+        bucket = mysh_llm._TokenBucket(6000)
+        bucket.tokens = 0
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            await bucket.acquire(5)
+            return loop.time() - start
+
+        self.assertGreaterEqual(asyncio.run(run()), 0.04)
+
+    def test_request_larger_than_capacity_does_not_hang(self):
+        bucket = mysh_llm._TokenBucket(10)
+
+        async def run():
+            await bucket.acquire(1000)
+
+        asyncio.run(asyncio.wait_for(run(), timeout=1))
+
+
+if __name__ == '__main__':
+    unittest.main()